@@ -27,12 +27,23 @@ import sys
 import os
 import re
 import json
+import mmap
+import time
+import fcntl
+import stat
 import struct
 import shutil
+import sqlite3
 import hashlib
 import plistlib
 import argparse
+import selectors
 import subprocess
+import threading
+import collections
+import concurrent.futures
+import http.client
+import urllib.parse
 import urllib.request
 import urllib.error
 import ctypes
@@ -45,6 +56,8 @@ from datetime import datetime
 DEFAULT_OUTPUT_DIR = Path.home() / "Library/Containers/com.liuliu.draw-things/Data/Documents/Models"
 BACKUP_DIR = Path.home() / ".cache/kernkraft235"
 MAX_BACKUPS = 10
+CIVITAI_CACHE_DB = BACKUP_DIR / "civitai.db"
+CIVITAI_CACHE_TTL = 30 * 24 * 3600  # seconds before a cached lookup is refetched
 DEFAULT_SIZE_LIMIT_MB = 1200
 
 CIVITAI_PFX = "civitai."
@@ -92,6 +105,13 @@ CIVITAI_FIELD_EXTRACTORS = {
 # Field names for reading xattrs back (same keys as extractors)
 CIVITAI_FIELDS = list(CIVITAI_FIELD_EXTRACTORS.keys())
 
+# Pre-encoded xattr names, so hot paths don't re-encode CIVITAI_PFX + field
+_CIVITAI_PFX_B = CIVITAI_PFX.encode()
+_CIVITAI_XATTR_NAMES = {
+    f: _CIVITAI_PFX_B + f.encode()
+    for f in CIVITAI_FIELDS + ["id", "metadata.version"]
+}
+
 # Header fix constants
 HDR_PREFIX = "model.diffusion_model."
 FIX_METADATA = 1
@@ -100,15 +120,33 @@ FIX_KEYS = 2
 # CivitAI API
 CIVITAI_BY_HASH = "https://civitai.com/api/v1/model-versions/by-hash/{}"
 CIVITAI_MODEL_URL = "https://civitai.com/models/{}"
+CIVITAI_WORKERS = 8             # concurrent lookups in a batch prefetch
+PROCESS_WORKERS = 4             # files processed at once (--non-interactive)
+CIVITAI_MAX_PER_SECOND = 5      # stay under CivitAI's API rate limit
 
 
 # ── xattr helpers (ctypes against macOS libc) ────────────────────────────────
 
 _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
 
+# Declared prototypes (macOS <sys/xattr.h>): ctypes skips per-call argument
+# guessing, and ssize_t returns aren't truncated to a 32-bit int.
+_libc.getxattr.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_void_p,
+                           ctypes.c_size_t, ctypes.c_uint32, ctypes.c_int]
+_libc.getxattr.restype = ctypes.c_ssize_t
+_libc.setxattr.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_void_p,
+                           ctypes.c_size_t, ctypes.c_uint32, ctypes.c_int]
+_libc.setxattr.restype = ctypes.c_int
+_libc.fsetxattr.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_void_p,
+                            ctypes.c_size_t, ctypes.c_uint32, ctypes.c_int]
+_libc.fsetxattr.restype = ctypes.c_int
+_libc.listxattr.argtypes = [ctypes.c_char_p, ctypes.c_void_p,
+                            ctypes.c_size_t, ctypes.c_int]
+_libc.listxattr.restype = ctypes.c_ssize_t
+
 
 def _xattr_get(path: str, name: bytes) -> bytes | None:
-    path_b = path.encode() if isinstance(path, str) else path
+    path_b = os.fsencode(path)
     size = _libc.getxattr(path_b, name, None, 0, 0, 0)
     if size < 0:
         return None
@@ -119,16 +157,19 @@ def _xattr_get(path: str, name: bytes) -> bytes | None:
     return buf.raw[:ret]
 
 
-def _xattr_set(path: str, name: bytes, value: bytes) -> None:
-    path_b = path.encode() if isinstance(path, str) else path
-    ret = _libc.setxattr(path_b, name, value, len(value), 0, 0)
+def _xattr_set(path: str | int, name: bytes, value: bytes) -> None:
+    """Set an xattr by path, or by open fd (fsetxattr, no path lookup)."""
+    if isinstance(path, int):
+        ret = _libc.fsetxattr(path, name, value, len(value), 0, 0)
+    else:
+        ret = _libc.setxattr(os.fsencode(path), name, value, len(value), 0, 0)
     if ret != 0:
         errno = ctypes.get_errno()
         raise OSError(errno, os.strerror(errno), path)
 
 
 def _xattr_list(path: str) -> list[bytes]:
-    path_b = path.encode() if isinstance(path, str) else path
+    path_b = os.fsencode(path)
     size = _libc.listxattr(path_b, None, 0, 0)
     if size <= 0:
         return []
@@ -139,22 +180,44 @@ def _xattr_list(path: str) -> list[bytes]:
     return [x for x in buf.raw[:ret].split(b"\x00") if x]
 
 
-def get_civitai_xattr(path: str, field: str) -> str | None:
-    raw = _xattr_get(path, (CIVITAI_PFX + field).encode())
+def read_all_xattrs(path: str) -> dict[bytes, bytes]:
+    """Snapshot every xattr on path: one listxattr, then one fetch per name."""
+    result = {}
+    for name in _xattr_list(path):
+        val = _xattr_get(path, name)
+        if val is not None:
+            result[name] = val
+    return result
+
+
+def _xattr_lookup(path: str, name: bytes, xattrs: dict | None) -> bytes | None:
+    """Read one xattr from a read_all_xattrs() snapshot, or from disk if none."""
+    if xattrs is not None:
+        return xattrs.get(name)
+    return _xattr_get(path, name)
+
+
+def _civitai_xattr_name(field: str) -> bytes:
+    name = _CIVITAI_XATTR_NAMES.get(field)
+    return name if name is not None else _CIVITAI_PFX_B + field.encode()
+
+
+def get_civitai_xattr(path: str, field: str, xattrs: dict | None = None) -> str | None:
+    raw = _xattr_lookup(path, _civitai_xattr_name(field), xattrs)
     if raw is None:
         return None
     return raw.decode("utf-8", errors="replace")
 
 
-def get_sha256_xattr(path: str) -> str | None:
-    raw = _xattr_get(path, XATTR_SHA256)
+def get_sha256_xattr(path: str, xattrs: dict | None = None) -> str | None:
+    raw = _xattr_lookup(path, XATTR_SHA256, xattrs)
     if raw is None:
         return None
     return raw.decode("utf-8", errors="replace")
 
 
-def get_fix_xattr(path: str) -> int | None:
-    raw = _xattr_get(path, XATTR_FIX)
+def get_fix_xattr(path: str, xattrs: dict | None = None) -> int | None:
+    raw = _xattr_lookup(path, XATTR_FIX, xattrs)
     if raw is None:
         return None
     try:
@@ -163,9 +226,9 @@ def get_fix_xattr(path: str) -> int | None:
         return None
 
 
-def civitai_xattr_exists(path: str) -> bool:
+def civitai_xattr_exists(path: str, xattrs: dict | None = None) -> bool:
     """True if any civitai.* data key is already set."""
-    return _xattr_get(path, (CIVITAI_PFX + "baseModel").encode()) is not None
+    return _xattr_lookup(path, _CIVITAI_XATTR_NAMES["baseModel"], xattrs) is not None
 
 
 def mark_sha256(path: str, hexdigest: str) -> None:
@@ -176,8 +239,11 @@ def mark_fix(path: str, fix_flags: int) -> None:
     _xattr_set(path, XATTR_FIX, str(fix_flags).encode())
 
 
-def mark_civitai(path: str, data: dict) -> int:
-    """Write extracted CivitAI fields as individual xattrs. Returns count written."""
+def mark_civitai(path: str | int, data: dict) -> int:
+    """
+    Write extracted CivitAI fields as individual xattrs. Returns count written.
+    Pass an open fd to skip the per-call path lookup.
+    """
     written = 0
     for field, extractor in CIVITAI_FIELD_EXTRACTORS.items():
         value = extractor(data)
@@ -187,42 +253,65 @@ def mark_civitai(path: str, data: dict) -> int:
             raw = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
         else:
             raw = str(value).encode()
-        _xattr_set(path, (CIVITAI_PFX + field).encode(), raw)
+        _xattr_set(path, _CIVITAI_XATTR_NAMES[field], raw)
         written += 1
     # Metadata version stamp
-    _xattr_set(path, (CIVITAI_PFX + "metadata.version").encode(), b"1")
+    _xattr_set(path, _CIVITAI_XATTR_NAMES["metadata.version"], b"1")
     return written
 
 
-def mark_where_froms(path: str, url: str) -> None:
+def mark_where_froms(path: str | int, url: str) -> None:
     """Overwrite kMDItemWhereFroms with a single-element binary plist array."""
     plist_bytes = plistlib.dumps([url], fmt=plistlib.FMT_BINARY)
     _xattr_set(path, XATTR_WHERE, plist_bytes)
 
 
-def propagate_xattrs(src: str, dst: str) -> int:
+def propagate_xattrs(src: str, dst: str, xattrs: dict | None = None) -> int:
     """Copy all civitai.* and kMDItemWhereFroms xattrs from src to dst."""
+    if xattrs is None:
+        xattrs = read_all_xattrs(src)
     copied = 0
-    for name in _xattr_list(src):
-        name_str = name.decode("utf-8", errors="replace")
-        if name_str.startswith(CIVITAI_PFX) or name == XATTR_WHERE:
-            val = _xattr_get(src, name)
-            if val is not None:
-                try:
-                    _xattr_set(dst, name, val)
-                    copied += 1
-                except OSError:
-                    pass
+    for name, val in xattrs.items():
+        if name.startswith(_CIVITAI_PFX_B) or name == XATTR_WHERE:
+            try:
+                _xattr_set(dst, name, val)
+                copied += 1
+            except OSError:
+                pass
     return copied
 
 
 # ── SHA256 ───────────────────────────────────────────────────────────────────
 
-def sha256_file(path: str) -> str:
+IO_CHUNK = 16 * 1024 * 1024
+MMAP_MIN_SIZE = 64 * 1024 * 1024
+
+
+def _sha256_mmap(f) -> str:
+    """
+    Hash an open file through a read-only mapping: one update() over the
+    whole map, so there is no per-chunk copy or Python round trip (the GIL
+    is released for the full call).
+    """
+    advise_sequential(f.fileno())
     h = hashlib.sha256()
-    with open(path, "rb") as f:
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        h.update(mm)
+    return h.hexdigest()
+
+
+def sha256_file(path: str) -> str:
+    with open(path, "rb", buffering=0) as f:
+        # Multi-GB maps need a 64-bit address space
+        if os.fstat(f.fileno()).st_size >= MMAP_MIN_SIZE and sys.maxsize > 2**32:
+            return _sha256_mmap(f)
+        if hasattr(hashlib, "file_digest"):  # 3.11+: read/update loop runs in C
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
         while True:
-            chunk = f.read(16 * 1024 * 1024)
+            chunk = f.read(IO_CHUNK)
             if not chunk:
                 break
             h.update(chunk)
@@ -239,10 +328,57 @@ def ensure_sha256(src_path: str) -> str:
     return digest
 
 
+def hash_files(files: list[Path], jobs: int) -> dict[str, str]:
+    """
+    Pre-compute SHA256 (and tag the xattr) for a batch in parallel.
+    hashlib releases the GIL while hashing large buffers, so threads scale
+    across cores. Returns {path: digest} for process_file's
+    precomputed_sha256; files that failed are left out and retried there.
+    """
+    digests = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(ensure_sha256, str(f)): f for f in files}
+        for fut in concurrent.futures.as_completed(futures):
+            try:
+                digests[str(futures[fut])] = fut.result()
+            except OSError as e:
+                print(f"[warn] sha256 failed for {futures[fut].name}: {e}")
+    return digests
+
+
 # ── CivitAI API ──────────────────────────────────────────────────────────────
 
-def fetch_civitai(sha256: str) -> dict | None:
-    url = CIVITAI_BY_HASH.format(sha256.upper())
+_civitai_local = threading.local()
+_civitai_direct = None
+
+
+def _civitai_can_connect_directly(host: str) -> bool:
+    """
+    True unless an HTTPS proxy (environment or macOS system settings)
+    applies to host. Raw http.client connections don't go through proxies,
+    so proxied lookups take the urlopen path instead. Checked once per run.
+    """
+    global _civitai_direct
+    if _civitai_direct is None:
+        proxies = urllib.request.getproxies()
+        _civitai_direct = "https" not in proxies or bool(urllib.request.proxy_bypass(host))
+    return _civitai_direct
+
+
+def _civitai_connection() -> http.client.HTTPSConnection:
+    """
+    Per-thread keep-alive connection to CivitAI, so a batch pays the TCP +
+    TLS handshake once per worker rather than once per file.
+    """
+    conn = getattr(_civitai_local, "conn", None)
+    if conn is None:
+        conn = http.client.HTTPSConnection(
+            urllib.parse.urlsplit(CIVITAI_BY_HASH).hostname, timeout=15)
+        _civitai_local.conn = conn
+    return conn
+
+
+def _fetch_civitai_urlopen(url: str) -> dict | None:
     req = urllib.request.Request(url, headers={"User-Agent": "dt-import/2.0"})
     try:
         with urllib.request.urlopen(req, timeout=15) as resp:
@@ -255,23 +391,186 @@ def fetch_civitai(sha256: str) -> dict | None:
         return None
 
 
-def ensure_civitai_xattrs(src_path: str, sha256: str) -> bool:
+def fetch_civitai(sha256: str) -> dict | None:
+    url = CIVITAI_BY_HASH.format(sha256.upper())
+    parts = urllib.parse.urlsplit(url)
+    if not _civitai_can_connect_directly(parts.hostname):
+        return _fetch_civitai_urlopen(url)
+    path = parts.path
+    conn = _civitai_connection()
+    for attempt in range(2):
+        try:
+            conn.request("GET", path, headers={"User-Agent": "dt-import/2.0"})
+            resp = conn.getresponse()
+            body = resp.read()
+            break
+        except (http.client.HTTPException, OSError):
+            # Server dropped the idle connection — reconnect and retry once
+            conn.close()
+            if attempt:
+                return None
+    if resp.status == 404:
+        return None
+    if 300 <= resp.status < 400:
+        return _fetch_civitai_urlopen(url)  # urllib follows redirects
+    if resp.status >= 400:
+        raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def _cache_connect() -> sqlite3.Connection | None:
+    """Open the local CivitAI response cache, or None if it's unusable."""
+    try:
+        BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(CIVITAI_CACHE_DB), timeout=5)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS civitai"
+            "(sha TEXT PRIMARY KEY, json BLOB, fetched_at INTEGER)"
+        )
+        return conn
+    except (sqlite3.Error, OSError):
+        return None
+
+
+def cache_get_many(hashes: list[str]) -> dict[str, dict]:
+    """
+    Cached CivitAI responses for the given hashes (misses are absent).
+    Entries older than CIVITAI_CACHE_TTL count as misses, so renamed models
+    and edited trigger words are picked up again.
+    """
+    conn = _cache_connect()
+    if conn is None:
+        return {}
+    result = {}
+    hashes = list(set(hashes))
+    cutoff = int(time.time()) - CIVITAI_CACHE_TTL
+    try:
+        for i in range(0, len(hashes), 500):  # stay under SQLite's variable limit
+            batch = hashes[i:i + 500]
+            rows = conn.execute(
+                f"SELECT sha, json FROM civitai WHERE sha IN ({','.join('?' * len(batch))})"
+                " AND fetched_at > ?",
+                batch + [cutoff],
+            )
+            for sha, blob in rows:
+                try:
+                    result[sha] = json.loads(blob)
+                except ValueError:
+                    pass
+    except sqlite3.Error:
+        pass
+    finally:
+        conn.close()
+    return result
+
+
+def cache_put_many(items: dict[str, dict]) -> None:
+    """Store CivitAI responses by hash. Cache failures are never fatal."""
+    if not items:
+        return
+    conn = _cache_connect()
+    if conn is None:
+        return
+    now = int(time.time())
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO civitai(sha, json, fetched_at) VALUES (?, ?, ?)",
+                [(sha, json.dumps(data, ensure_ascii=False).encode(), now)
+                 for sha, data in items.items()],
+            )
+    except sqlite3.Error:
+        pass
+    finally:
+        conn.close()
+
+
+_civitai_gate = threading.Lock()
+_civitai_next_slot = 0.0
+
+
+def _civitai_throttle() -> None:
+    """Space out request starts to at most CIVITAI_MAX_PER_SECOND."""
+    global _civitai_next_slot
+    with _civitai_gate:
+        now = time.monotonic()
+        wait = _civitai_next_slot - now
+        _civitai_next_slot = max(now, _civitai_next_slot) + 1.0 / CIVITAI_MAX_PER_SECOND
+    if wait > 0:
+        time.sleep(wait)
+
+
+def prefetch_civitai(hashes: list[str]) -> dict[str, dict | None]:
+    """
+    Look up many hashes concurrently so a batch doesn't pay one HTTPS round
+    trip per file in series. The local cache is checked first in one query.
+    Returns {sha256: data or None}. None means a 404 or a failed request
+    (network error, bad JSON) — neither is retried this run. Hashes whose
+    request raised an HTTP error other than 404 are left out, so the
+    per-file stage tries them again.
+    """
+    def lookup(sha256: str) -> dict | None:
+        _civitai_throttle()
+        return fetch_civitai(sha256)
+
+    result = cache_get_many(hashes)
+    missing = set(hashes) - result.keys()
+    fetched = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=CIVITAI_WORKERS) as pool:
+        futures = {pool.submit(lookup, h): h for h in missing}
+        for fut in concurrent.futures.as_completed(futures):
+            try:
+                data = fut.result()
+            except Exception:
+                continue
+            result[futures[fut]] = data
+            if data is not None:
+                fetched[futures[fut]] = data
+    cache_put_many(fetched)
+    return result
+
+
+def ensure_civitai_xattrs(
+    src_path: str,
+    sha256: str,
+    prefetched: dict | None = None,
+) -> bool:
     """
     Fetch CivitAI data by hash if xattrs not already present.
+    Uses the prefetch_civitai() result for this hash when there is one,
+    then the local cache, then the API.
     Returns True if CivitAI data is available (pre-existing or freshly fetched).
     """
     if civitai_xattr_exists(src_path):
         return True
 
-    data = fetch_civitai(sha256)
+    if prefetched is not None and sha256 in prefetched:
+        data = prefetched[sha256]
+    else:
+        data = cache_get_many([sha256]).get(sha256)
+        if data is None:
+            data = fetch_civitai(sha256)
+            if data is not None:
+                cache_put_many({sha256: data})
     if data is None:
         return False
 
-    n = mark_civitai(src_path, data)
-    model_id = data.get("modelId")
-    if model_id is not None:
-        model_url = CIVITAI_MODEL_URL.format(model_id)
-        mark_where_froms(src_path, model_url)
+    # One open + fsetxattr per field instead of a path lookup per setxattr
+    fd = os.open(src_path, os.O_RDONLY)
+    try:
+        n = mark_civitai(fd, data)
+        model_id = data.get("modelId")
+        model_url = None
+        if model_id is not None:
+            model_url = CIVITAI_MODEL_URL.format(model_id)
+            mark_where_froms(fd, model_url)
+    finally:
+        os.close(fd)
+
+    if model_url is not None:
         print(f"  [civitai] {n} fields fetched, WhereFroms → {model_url}")
     else:
         print(f"  [civitai] {n} fields fetched")
@@ -280,19 +579,57 @@ def ensure_civitai_xattrs(src_path: str, sha256: str) -> bool:
 
 # ── safetensors header parsing & fixing ──────────────────────────────────────
 
+HEADER_PROBE_SIZE = 256 * 1024
+
+
+def advise_sequential(fd: int) -> None:
+    """Hint the kernel to read ahead on fd (F_RDAHEAD on macOS, fadvise elsewhere)."""
+    try:
+        if sys.platform == "darwin":
+            fcntl.fcntl(fd, getattr(fcntl, "F_RDAHEAD", 45), 1)
+        elif hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    except OSError:
+        pass
+
+
+def _slim_tensor_info(obj: dict):
+    """json object_hook: keep only the shape of each tensor entry."""
+    shape = obj.get("shape")
+    if shape is not None and "data_offsets" in obj:
+        return shape
+    return obj
+
+
 def read_safetensors_header(path: str) -> dict | None:
-    """Read the JSON header from a safetensors file (no tensor data)."""
+    """
+    Read the JSON header from a safetensors file (no tensor data), for
+    detection only: tensor entries are reduced to their shape list while
+    decoding, so dtype/offset objects are never kept around. Roughly halves
+    peak memory on headers with tens of thousands of keys.
+    """
     try:
-        with open(path, "rb") as f:
-            raw_len = f.read(8)
-            if len(raw_len) < 8:
-                return None
-            header_len = struct.unpack("<Q", raw_len)[0]
-            if header_len > 100 * 1024 * 1024:  # sanity: 100MB header max
-                return None
-            return json.loads(f.read(header_len).decode("utf-8"))
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        advise_sequential(fd)
+        # One pread covers the length prefix and, for most LoRAs, the header
+        buf = os.pread(fd, HEADER_PROBE_SIZE, 0)
+        if len(buf) < 8:
+            return None
+        header_len = struct.unpack("<Q", buf[:8])[0]
+        if header_len > 100 * 1024 * 1024:  # sanity: 100MB header max
+            return None
+        if 8 + header_len <= len(buf):
+            raw = buf[8:8 + header_len]
+        else:
+            raw = buf[8:] + os.pread(fd, 8 + header_len - len(buf), len(buf))
+        return json.loads(raw, object_hook=_slim_tensor_info)
     except Exception:
         return None
+    finally:
+        os.close(fd)
 
 
 def detect_fixes(header: dict) -> int:
@@ -309,13 +646,51 @@ def build_fixed_header(header: dict, flags: int) -> bytes:
     """Build the fixed header bytes."""
     if flags & FIX_METADATA:
         header.pop("__metadata__", None)
-    new_header = {}
-    for k, v in header.items():
-        if (flags & FIX_KEYS) and k.startswith(HDR_PREFIX):
-            new_header[k[len(HDR_PREFIX):]] = v
-        else:
-            new_header[k] = v
-    return json.dumps(new_header, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    # Metadata-only fixes serialise the dict as is; key fixes rebuild it in
+    # one pass, which keeps key order (nearly every key carries the prefix)
+    if flags & FIX_KEYS:
+        n = len(HDR_PREFIX)
+        header = {k[n:] if k.startswith(HDR_PREFIX) else k: v for k, v in header.items()}
+    return json.dumps(header, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def copy_range(fin, fout, offset: int, count: int) -> None:
+    """
+    Copy count bytes of fin starting at offset to fout's current position.
+    Uses sendfile(2) for a kernel-side copy where the OS allows file-to-file
+    transfers (Linux); macOS only sends to sockets, so it takes the
+    buffered copy below.
+    """
+    fout.flush()
+    try:
+        while count > 0:
+            sent = os.sendfile(fout.fileno(), fin.fileno(), offset, count)
+            if sent == 0:
+                break
+            offset += sent
+            count -= sent
+        return
+    except (AttributeError, OSError):
+        pass
+    fin.seek(offset)
+    while count > 0:
+        chunk = fin.read(min(count, IO_CHUNK))
+        if not chunk:
+            break
+        fout.write(chunk)
+        count -= len(chunk)
+
+
+def write_header_inplace(path: str, header_bytes: bytes, header_len: int) -> None:
+    """Overwrite the header slot in place, space-padded to header_len bytes."""
+    padded = header_bytes + b" " * (header_len - len(header_bytes))
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        # Length prefix is unchanged, so only the JSON bytes after it move
+        if os.pwrite(fd, padded, 8) != len(padded):
+            raise OSError(f"short write rewriting header of {path}")
+    finally:
+        os.close(fd)
 
 
 def fix_header_inplace(src_path: str, sha256: str) -> None:
@@ -340,28 +715,35 @@ def fix_header_inplace(src_path: str, sha256: str) -> None:
     p = Path(src_path)
     with p.open("rb") as fin:
         header_len = struct.unpack("<Q", fin.read(8))[0]
-        header = json.loads(fin.read(header_len).decode("utf-8"))
-        flags = detect_fixes(header)
+        header = json.loads(fin.read(header_len))
+    flags = detect_fixes(header)
 
-        if not flags:
-            mark_fix(src_path, 0)
-            print(f"  [fix] no fix needed (clean)")
-            return
+    if not flags:
+        mark_fix(src_path, 0)
+        print(f"  [fix] no fix needed (clean)")
+        return
 
-        fixed_bytes = build_fixed_header(header, flags)
-        tmp = p.with_suffix(".tmp.safetensors")
+    fixed_bytes = build_fixed_header(header, flags)
 
-        with tmp.open("wb") as fout:
+    if len(fixed_bytes) <= header_len:
+        # Fast path: the fixed header fits in the old slot (always true when
+        # only stripping), so pad it with spaces — allowed by the safetensors
+        # spec — and rewrite just the header. Tensor data is never touched.
+        write_header_inplace(src_path, fixed_bytes, header_len)
+    else:
+        saved = read_all_xattrs(src_path)
+        tmp = p.with_suffix(".tmp.safetensors")
+        payload_offset = 8 + header_len
+        with p.open("rb") as fin, tmp.open("wb") as fout:
             fout.write(struct.pack("<Q", len(fixed_bytes)))
             fout.write(fixed_bytes)
-            while True:
-                chunk = fin.read(16 * 1024 * 1024)
-                if not chunk:
-                    break
-                fout.write(chunk)
-
-    tmp.replace(p)
-    mark_sha256(src_path, sha256)  # re-apply — overwrite lost the xattr
+            copy_range(fin, fout, payload_offset,
+                       os.fstat(fin.fileno()).st_size - payload_offset)
+        tmp.replace(p)
+        # re-apply — overwrite lost the xattrs
+        for name, val in saved.items():
+            _xattr_set(src_path, name, val)
+        mark_sha256(src_path, sha256)
     mark_fix(src_path, flags)
 
     fix_desc = "+".join(
@@ -373,14 +755,94 @@ def fix_header_inplace(src_path: str, sha256: str) -> None:
 
 # ── version detection from safetensors keys ──────────────────────────────────
 
-def detect_version_from_keys(header: dict) -> str | None:
+# Tensor-key substrings that pin the version outright (kohya + diffusers forms)
+_VERSION_MARKERS = {
+    "single_blocks.39.linear1":         "flux2",
+    "single_blocks_39_linear1":         "flux2",
+    "single_transformer_blocks.39.":    "flux2",
+    "single_transformer_blocks_39_":    "flux2",
+    "single_blocks.23.linear1":         "flux2_9b",
+    "single_blocks_23_linear1":         "flux2_9b",
+    "single_transformer_blocks.23.":    "flux2_9b",
+    "single_transformer_blocks_23_":    "flux2_9b",
+    "single_blocks.19.linear1":         "flux2_4b",
+    "single_blocks_19_linear1":         "flux2_4b",
+    "single_transformer_blocks.19.":    "flux2_4b",
+    "single_transformer_blocks_19_":    "flux2_4b",
+    "layers.29.feed_forward.w3.":       "z_image",
+    "layers_29_feed_forward_w3":        "z_image",
+    "transformer_blocks.59.txt_mlp.":   "qwen_image",
+    "transformer_blocks_59_txt_mlp":    "qwen_image",
+    "transformer_blocks.37.attn.":      "qwen_image",
+    "transformer_blocks_37_attn_":      "qwen_image",
+}
+_VERSION_RE = re.compile("|".join(re.escape(m) for m in _VERSION_MARKERS))
+_LOHA_RE = re.compile(r"[._]hada_w1_[ab]")
+_TB_TOKEN = "transformer_blocks"
+
+
+def _transformer_block_index(k: str) -> int:
+    """
+    Block number from the first '(^|[._])transformer_blocks[._]<n>[._]' in a
+    key, or -1. A literal find() gates the check, so the thousands of keys
+    without the token never reach per-character parsing.
+    """
+    i = k.find(_TB_TOKEN)
+    while i >= 0:
+        start = i + len(_TB_TOKEN) + 1
+        if ((i == 0 or k[i - 1] in "._")
+                and start <= len(k) and k[start - 1] in "._"):
+            end = start
+            while end < len(k) and k[end].isdecimal():
+                end += 1
+            if end > start and end < len(k) and k[end] in "._":
+                return int(k[start:end])
+        i = k.find(_TB_TOKEN, i + 1)
+    return -1
+
+
+def inspect_header(header: dict) -> dict:
+    """
+    Walk the tensor keys once and collect everything detection needs:
+    version marker hits, highest transformer_blocks index, double-stream
+    modulation, the SDXL attn2.to_k width check, and LoHa markers.
+    """
+    info = {
+        "hits": set(),
+        "max_tb_idx": -1,
+        "has_double_stream_mod": False,
+        "is_sdxl": False,
+        "is_loha": False,
+    }
+    hits = info["hits"]
+    for k, v in header.items():
+        if k == "__metadata__":
+            continue
+        for marker in _VERSION_RE.findall(k):
+            hits.add(_VERSION_MARKERS[marker])
+        tb_idx = _transformer_block_index(k)
+        if tb_idx > info["max_tb_idx"]:
+            info["max_tb_idx"] = tb_idx
+        if "double_stream_modulation" in k:
+            info["has_double_stream_mod"] = True
+        if "hada_w1_" in k and _LOHA_RE.search(k):
+            info["is_loha"] = True
+        if "input_blocks" in k and not info["is_sdxl"]:
+            k_flat = k.replace(".", "_")
+            if ("input_blocks_4_1_transformer_blocks_0_attn2_to_k" in k_flat
+                    or "input_blocks.4.1.transformer_blocks.0.attn2.to_k" in k):
+                shape = v.get("shape", []) if isinstance(v, dict) else v
+                if shape and shape[-1] == 2048:
+                    info["is_sdxl"] = True
+    return info
+
+
+def detect_version_from_keys(header: dict, info: dict | None = None) -> str | None:
     """
     Detect LoRA model version from safetensors tensor key names.
-    Fallback for files without CivitAI data.
+    Fallback for files without CivitAI data. Pass a precomputed
+    inspect_header() result to avoid walking the keys again.
     """
-    keys = set(header.keys()) - {"__metadata__"}
-    key_str = " ".join(keys)
-
     # Heuristic 0: __metadata__.modelspec.architecture
     metadata = header.get("__metadata__", {})
     if isinstance(metadata, dict):
@@ -396,39 +858,18 @@ def detect_version_from_keys(header: dict) -> str | None:
             elif "qwen" in arch_lower:
                 return "qwen_image"
 
+    if info is None:
+        info = inspect_header(header)
+    hits = info["hits"]
+    max_tb_idx = info["max_tb_idx"]
+    has_double_stream_mod = info["has_double_stream_mod"]
+
     # Heuristic 1: single_blocks check (LoRAImporter.swift-style)
-    is_flux2 = ("single_blocks.39.linear1" in key_str
-                or "single_blocks_39_linear1" in key_str
-                or "single_transformer_blocks.39." in key_str
-                or "single_transformer_blocks_39_" in key_str)
-    if is_flux2:
-        return "flux2"
-
-    is_flux2_9b = ("single_blocks.23.linear1" in key_str
-                   or "single_blocks_23_linear1" in key_str
-                   or "single_transformer_blocks.23." in key_str
-                   or "single_transformer_blocks_23_" in key_str)
-    if is_flux2_9b:
-        return "flux2_9b"
-
-    is_flux2_4b = ("single_blocks.19.linear1" in key_str
-                   or "single_blocks_19_linear1" in key_str
-                   or "single_transformer_blocks.19." in key_str
-                   or "single_transformer_blocks_19_" in key_str)
-    if is_flux2_4b:
-        return "flux2_4b"
+    for flux_version in ("flux2", "flux2_9b", "flux2_4b"):
+        if flux_version in hits:
+            return flux_version
 
     # Heuristic 2: OneTrainer/diffusers transformer_blocks range counting
-    max_tb_idx = -1
-    has_double_stream_mod = False
-    tb_pattern = re.compile(r'(?:^|[._])transformer_blocks[._](\d+)[._]')
-    for k in keys:
-        m = tb_pattern.search(k)
-        if m:
-            max_tb_idx = max(max_tb_idx, int(m.group(1)))
-        if "double_stream_modulation" in k:
-            has_double_stream_mod = True
-
     if max_tb_idx >= 0 or has_double_stream_mod:
         is_flux_family = (has_double_stream_mod
                           or "flux" in metadata.get("modelspec.architecture", "").lower())
@@ -447,39 +888,26 @@ def detect_version_from_keys(header: dict) -> str | None:
             return "qwen_image"
 
     # Z-Image
-    if ("layers.29.feed_forward.w3." in key_str
-            or "layers_29_feed_forward_w3" in key_str):
+    if "z_image" in hits:
         return "z_image"
 
     # Qwen Image
-    if ("transformer_blocks.59.txt_mlp." in key_str
-            or "transformer_blocks_59_txt_mlp" in key_str
-            or "transformer_blocks.37.attn." in key_str
-            or "transformer_blocks_37_attn_" in key_str):
+    if "qwen_image" in hits:
         return "qwen_image"
 
     # SDXL
-    for k, v in header.items():
-        if k == "__metadata__":
-            continue
-        k_flat = k.replace(".", "_")
-        if ("input_blocks_4_1_transformer_blocks_0_attn2_to_k" in k_flat
-                or "input_blocks.4.1.transformer_blocks.0.attn2.to_k" in k):
-            shape = v.get("shape", [])
-            if shape and shape[-1] == 2048:
-                return "sdxl_base_v0.9"
+    if info["is_sdxl"]:
+        return "sdxl_base_v0.9"
 
     return None
 
 
 def detect_is_loha(header: dict) -> bool:
     """Check if the LoRA uses LoHa (Hadamard) format."""
-    for k in header:
-        if k == "__metadata__":
-            continue
-        if ".hada_w1_a" in k or ".hada_w1_b" in k or "_hada_w1_a" in k or "_hada_w1_b" in k:
-            return True
-    return False
+    return any(
+        "hada_w1_" in k and _LOHA_RE.search(k)
+        for k in header if k != "__metadata__"
+    )
 
 
 # ── version resolution ───────────────────────────────────────────────────────
@@ -489,6 +917,8 @@ def resolve_version(
     header: dict | None,
     cli_version: str | None,
     non_interactive: bool,
+    xattrs: dict | None = None,
+    info: dict | None = None,
 ) -> str | None:
     """
     Resolve DT version. Priority:
@@ -500,12 +930,13 @@ def resolve_version(
     if cli_version:
         return cli_version
 
-    base_model = get_civitai_xattr(src_path, "baseModel")
-    if base_model and base_model in CIVITAI_TO_DT_VERSION:
-        return CIVITAI_TO_DT_VERSION[base_model]
+    base_model = get_civitai_xattr(src_path, "baseModel", xattrs)
+    mapped = CIVITAI_TO_DT_VERSION.get(base_model) if base_model else None
+    if mapped:
+        return mapped
 
     if header:
-        detected = detect_version_from_keys(header)
+        detected = detect_version_from_keys(header, info)
         if detected:
             return detected
 
@@ -550,12 +981,18 @@ _NAME_STRIP_RE = re.compile(
     r"\b(?:" + "|".join(re.escape(t) for t in _NAME_STRIP_TOKENS) + r")\b",
     re.IGNORECASE,
 )
+_NAME_PARENS_RE = re.compile(r"\([^)]*\)")
+# Whitespace and pipes collapse together: a pipe between segments, or one
+# left dangling after token stripping, just becomes a single space
+_NAME_SEP_RE = re.compile(r"[\s|]+")
+_NAME_WS_RE = re.compile(r"\s+")
 
 
 def derive_name(
     src_path: str,
     cli_name: str | None,
     civitai_base_model: str | None,
+    xattrs: dict | None = None,
 ) -> str:
     """
     Derive display name for the LoRA.
@@ -565,45 +1002,35 @@ def derive_name(
     if cli_name:
         raw_name = cli_name
     else:
-        civitai_name = get_civitai_xattr(src_path, "name")
+        civitai_name = get_civitai_xattr(src_path, "name", xattrs)
         if civitai_name:
             raw_name = civitai_name
         else:
             raw_name = Path(src_path).stem
 
     # Remove parenthesized content
-    raw_name = re.sub(r"\([^)]*\)", "", raw_name).strip()
+    raw_name = _NAME_PARENS_RE.sub("", raw_name)
 
     # Strip architecture/version tokens (DT filters by version already)
     raw_name = _NAME_STRIP_RE.sub("", raw_name)
 
-    # Collapse whitespace first so pipe checks work cleanly
-    raw_name = re.sub(r"\s+", " ", raw_name).strip()
-    # Remove orphan pipes: "Foo | " or " | Bar" or bare " | "
-    raw_name = re.sub(r"\s*\|\s*$", "", raw_name)
-    raw_name = re.sub(r"^\s*\|\s*", "", raw_name)
-    # Remove pipe between segments where one side got stripped to nothing
-    # e.g. "Selfies |  i2i" → "Selfies i2i"
-    raw_name = re.sub(r"\s*\|\s*", " ", raw_name)
-    # Clean up leading/trailing junk
-    raw_name = re.sub(r"^[\s\-_|]+", "", raw_name)
-    raw_name = re.sub(r"[\s\-_|]+$", "", raw_name)
-    raw_name = re.sub(r"\s+", " ", raw_name).strip()
+    # Collapse whitespace and pipes in one pass, e.g. "Selfies |  i2i" →
+    # "Selfies i2i", then trim leading/trailing junk
+    raw_name = _NAME_SEP_RE.sub(" ", raw_name).strip(" -_")
 
     # Qwen special: if name contains 2509/2511/2512, move to front
     if civitai_base_model == "Qwen":
         for num in ("2512", "2511", "2509"):
             if num in raw_name:
                 cleaned = raw_name.replace(num, "").strip(" -_")
-                cleaned = re.sub(r"\s+", " ", cleaned).strip()
+                cleaned = _NAME_WS_RE.sub(" ", cleaned).strip()
                 raw_name = f"{num}-{cleaned}" if cleaned else num
                 break
 
     # Apply base model prefix
-    if civitai_base_model and civitai_base_model in CIVITAI_NAME_PREFIX:
-        prefix = CIVITAI_NAME_PREFIX[civitai_base_model]
-        if not raw_name.startswith(prefix):
-            raw_name = prefix + raw_name
+    prefix = CIVITAI_NAME_PREFIX.get(civitai_base_model) if civitai_base_model else None
+    if prefix and not raw_name.startswith(prefix):
+        raw_name = prefix + raw_name
 
     return raw_name
 
@@ -616,12 +1043,16 @@ _CLIP_VERSIONS = {"sdxl_base_v0.9", "v1", "v2"}
 _T5_VERSIONS = {"flux2", "flux2_9b", "flux2_4b", "flux1", "qwen_image", "z_image"}
 
 
-def derive_trigger_words(src_path: str, dt_version: str | None) -> str:
+def derive_trigger_words(
+    src_path: str,
+    dt_version: str | None,
+    xattrs: dict | None = None,
+) -> str:
     """
     Build the 'prefix' field from CivitAI triggerWords xattr.
     Separator: commas for CLIP-based models, periods for T5/LLM-based.
     """
-    raw = get_civitai_xattr(src_path, "triggerWords")
+    raw = get_civitai_xattr(src_path, "triggerWords", xattrs)
     if not raw:
         return ""
 
@@ -662,14 +1093,14 @@ def derive_trigger_words(src_path: str, dt_version: str | None) -> str:
 _CIVITAI_JSON_FIELDS = ["nsfwLevel", "baseModel", "name", "air"]
 
 
-def collect_civitai_data(src_path: str) -> dict | None:
+def collect_civitai_data(src_path: str, xattrs: dict | None = None) -> dict | None:
     """
     Collect CivitAI xattr data into a slim dict for embedding in JSON.
     Only: nsfwLevel, baseModel, name, air, sha256 (pre-modification hash).
     """
     data = {}
     for field in _CIVITAI_JSON_FIELDS:
-        val = get_civitai_xattr(src_path, field)
+        val = get_civitai_xattr(src_path, field, xattrs)
         if val is None:
             continue
         try:
@@ -678,7 +1109,7 @@ def collect_civitai_data(src_path: str) -> dict | None:
         except (json.JSONDecodeError, TypeError):
             data[field] = val
 
-    sha256 = get_sha256_xattr(src_path)
+    sha256 = get_sha256_xattr(src_path, xattrs)
     if sha256:
         data["sha256"] = sha256
 
@@ -712,11 +1143,13 @@ def backup_json(json_path: Path) -> None:
 # ── JSON registration ────────────────────────────────────────────────────────
 
 def load_json(json_path: Path) -> list:
-    if not json_path.exists():
-        return []
+    """
+    Parse the registry once per run; the list is shared by every file in the
+    batch. Bytes go straight to json.loads, skipping a str copy of the file.
+    """
     try:
-        return json.loads(json_path.read_text("utf-8"))
-    except (json.JSONDecodeError, OSError):
+        return json.loads(json_path.read_bytes())
+    except (ValueError, OSError):  # missing, unreadable, or not valid JSON
         return []
 
 
@@ -727,75 +1160,147 @@ def save_json(json_path: Path, data: list) -> None:
     )
 
 
-def is_duplicate(entries: list, ckpt_filename: str, sha256: str | None) -> str | None:
+def index_entries(entries: list) -> dict[str, dict]:
+    """
+    Build lookup tables over the registry so duplicate checks are O(1):
+    {"file": {ckpt filename: entry}, "ckpt": {ckpt sha256: entry},
+     "sha256": {civitai sha256: entry}, "id": {civitai version id: entry},
+     "pending": {("sha256" | "id", key): src_path}}. First entry wins, as in
+    a scan. "pending" holds keys reserved by files still being processed.
+    """
+    index = {"file": {}, "ckpt": {}, "sha256": {}, "id": {}, "pending": {}}
+    for entry in entries:
+        _index_entry(index, entry)
+    return index
+
+
+def _index_entry(index: dict, entry: dict) -> None:
+    civitai = entry.get("civitai") or {}
+    for table, key in (
+        ("file", entry.get("file")),
+        ("ckpt", entry.get("sha256")),
+        ("sha256", civitai.get("sha256")),
+        ("id", str(civitai.get("id", ""))),
+    ):
+        if key:
+            index[table].setdefault(key, entry)
+
+
+def add_entry(entries: list, index: dict, entry: dict) -> None:
+    """Append a new registry entry and keep the index in sync."""
+    entries.append(entry)
+    _index_entry(index, entry)
+
+
+def is_duplicate(index: dict, ckpt_filename: str, sha256: str | None) -> str | None:
     """
     Check if this LoRA is already registered.
     Returns the existing name if duplicate, None otherwise.
     """
-    for entry in entries:
-        if entry.get("file") == ckpt_filename:
-            return entry.get("name", ckpt_filename)
-        civitai = entry.get("civitai", {})
-        if sha256 and civitai.get("sha256") == sha256:
-            return entry.get("name", ckpt_filename)
-    return None
+    entry = index["file"].get(ckpt_filename)
+    if entry is None and sha256:
+        entry = index["sha256"].get(sha256)
+    if entry is None:
+        return None
+    return entry.get("name", ckpt_filename)
+
+
+def _is_separate_copy(path: Path, twin: Path) -> bool:
+    """
+    True only if twin exists on disk as a file distinct from path. A missing
+    twin, or one that is path itself (case-insensitive APFS, links), is
+    never confirmed — callers must not delete path on an unconfirmed match.
+    """
+    try:
+        return twin.is_file() and not os.path.samefile(path, twin)
+    except OSError:
+        return False
+
+
+def release_pending(index: dict, src_path: str) -> None:
+    """Drop the keys preflight() reserved for src_path (it wasn't registered)."""
+    for key in [k for k, v in index["pending"].items() if v == src_path]:
+        del index["pending"][key]
+
+
+# Guards entries/index while files are processed in parallel
+_registry_lock = threading.Lock()
 
 
 # ── pre-flight checks ────────────────────────────────────────────────────────
 
 def preflight(
     src_path: str,
-    entries: list,
+    index: dict,
     size_limit_mb: int,
+    xattrs: dict | None = None,
+    stat_result: os.stat_result | None = None,
 ) -> tuple[bool, str]:
-    """Run pre-flight checks. Returns (ok, reason)."""
-    p = Path(src_path)
-
-    # Size check
-    file_size = p.stat().st_size
+    """
+    Run pre-flight checks. Returns (ok, reason).
+    On success the file's SHA256 and CivitAI id are reserved in
+    index["pending"], so another file of the same batch can't pass the
+    duplicate checks before this one is registered. Call with
+    _registry_lock held.
+    """
+    # Size check (reuses the stat from file collection when given)
+    file_size = (stat_result or os.stat(src_path)).st_size
     limit_bytes = size_limit_mb * 1024 * 1024
     if size_limit_mb > 0 and file_size > limit_bytes:
         return False, f"file too large ({file_size / (1024**2):.0f} MB > {size_limit_mb} MB limit, use --size-limit)"
 
     # Is it a LoRA?
-    model_type = get_civitai_xattr(src_path, "modelType")
+    model_type = get_civitai_xattr(src_path, "modelType", xattrs)
     if model_type and model_type.upper() != "LORA":
         return False, f"not a LoRA (CivitAI modelType={model_type!r})"
 
     # Duplicate check by SHA256
-    sha256 = get_sha256_xattr(src_path)
+    sha256 = get_sha256_xattr(src_path, xattrs)
     if sha256:
-        existing = is_duplicate(entries, "", sha256)
+        existing = is_duplicate(index, "", sha256)
         if existing:
             return False, f"already imported as {existing!r} (SHA256 match)"
+        other = index["pending"].get(("sha256", sha256))
+        if other:
+            return False, f"same file as {Path(other).name!r} in this batch (SHA256 match)"
 
     # Duplicate check by CivitAI model version ID
-    civitai_id = get_civitai_xattr(src_path, "id")
+    civitai_id = get_civitai_xattr(src_path, "id", xattrs)
     if civitai_id:
-        for entry in entries:
-            civitai = entry.get("civitai", {})
-            entry_id = str(civitai.get("id", ""))
-            if entry_id == civitai_id:
-                return False, f"already imported as {entry.get('name', '?')!r} (CivitAI id match)"
+        entry = index["id"].get(civitai_id)
+        if entry is not None:
+            return False, f"already imported as {entry.get('name', '?')!r} (CivitAI id match)"
+        other = index["pending"].get(("id", civitai_id))
+        if other:
+            return False, f"same model as {Path(other).name!r} in this batch (CivitAI id match)"
 
+    if sha256:
+        index["pending"][("sha256", sha256)] = src_path
+    if civitai_id:
+        index["pending"][("id", civitai_id)] = src_path
     return True, ""
 
 
 # ── pipeline stages ──────────────────────────────────────────────────────────
 
-def stage_sha256_and_civitai(src_path: str, skip_civitai: bool) -> str:
+def stage_sha256_and_civitai(
+    src_path: str,
+    skip_civitai: bool,
+    prefetched: dict | None = None,
+    precomputed_sha256: str | None = None,
+) -> str:
     """
-    Stage 1-2: Compute SHA256, fetch CivitAI data.
-    Returns the SHA256 hex digest.
+    Stage 1-2: Compute SHA256 (unless the batch pre-pass already did),
+    fetch CivitAI data. Returns the SHA256 hex digest.
     """
-    sha256 = ensure_sha256(src_path)
+    sha256 = precomputed_sha256 or ensure_sha256(src_path)
     print(f"  [sha256] {sha256}")
 
     if not skip_civitai:
         if civitai_xattr_exists(src_path):
             print(f"  [civitai] xattrs already present")
         else:
-            has_data = ensure_civitai_xattrs(src_path, sha256)
+            has_data = ensure_civitai_xattrs(src_path, sha256, prefetched)
             if not has_data:
                 print(f"  [civitai] not found on CivitAI (non-CivitAI file?)")
 
@@ -807,6 +1312,181 @@ def stage_header_fix(src_path: str, sha256: str) -> None:
     fix_header_inplace(src_path, sha256)
 
 
+# ── LoRAConverter ────────────────────────────────────────────────────────────
+
+CONVERTER_TAIL_LINES = 5
+_CKPT_UNDERSCORES_RE = re.compile(r"_{2,}")
+
+
+def converter_cmd(
+    converter: str,
+    src_path: str,
+    name: str,
+    output_dir: Path,
+    version: str | None,
+    scale_factor: str | None,
+) -> list[str]:
+    cmd = [
+        converter,
+        "--file", src_path,
+        "--name", name,
+        "--output-directory", str(output_dir),
+    ]
+    # Always pass --version when known — LoRAConverter's built-in detection
+    # fails on OneTrainer/diffusers format LoRAs (common format).
+    if version:
+        cmd += ["--version", version]
+    if scale_factor:
+        cmd += ["--scale-factor", scale_factor]
+    return cmd
+
+
+def run_converter(cmd: list[str]) -> tuple[int, str, list[str], int]:
+    """
+    Run LoRAConverter, draining stdout and stderr as they arrive.
+    It dumps every weight hash to stdout, which is only shown on error, so
+    keep the last CONVERTER_TAIL_LINES lines rather than buffering it all.
+    Returns (returncode, stderr, stdout tail, stdout line count).
+    """
+    tail = collections.deque(maxlen=CONVERTER_TAIL_LINES)
+    n_lines = 0
+    partial = b""
+    err = []
+    # close_fds=False (our fds are non-inheritable anyway, PEP 446) plus the
+    # absolute path from main() lets CPython use posix_spawn instead of
+    # fork + exec with a close-all-fds sweep in the child
+    with subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, close_fds=False,
+    ) as proc:
+        with selectors.DefaultSelector() as sel:
+            sel.register(proc.stdout, selectors.EVENT_READ)
+            sel.register(proc.stderr, selectors.EVENT_READ)
+            while sel.get_map():
+                for key, _ in sel.select():
+                    data = os.read(key.fd, 65536)
+                    if not data:
+                        sel.unregister(key.fileobj)
+                    elif key.fileobj is proc.stderr:
+                        err.append(data)
+                    else:
+                        lines = (partial + data).split(b"\n")
+                        partial = lines.pop()
+                        for line in lines:
+                            if line.strip():
+                                tail.append(line)
+                                n_lines += 1
+        returncode = proc.wait()
+    if partial.strip():
+        tail.append(partial)
+        n_lines += 1
+    stdout_tail = [l.decode("utf-8", "replace") for l in tail]
+    return returncode, b"".join(err).decode("utf-8", "replace").strip(), stdout_tail, n_lines
+
+
+def snapshot_ckpts(output_dir: Path) -> dict[str, int]:
+    """{.ckpt name: st_mtime_ns} for output_dir (empty if it doesn't exist)."""
+    snapshot = {}
+    try:
+        with os.scandir(output_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".ckpt"):
+                    try:
+                        snapshot[entry.name] = entry.stat().st_mtime_ns
+                    except OSError:
+                        pass
+    except FileNotFoundError:
+        pass
+    return snapshot
+
+
+def new_ckpt_since(output_dir: Path, before: dict[str, int]) -> Path | None:
+    """
+    The .ckpt LoRAConverter wrote since the snapshot `before`: a new name,
+    or an existing one whose mtime changed (overwritten in place). Compares
+    mtimes with each other, not with the clock, so it works on filesystems
+    with coarse timestamps. The newest wins if there are several.
+    """
+    changed = [
+        (mtime_ns, name) for name, mtime_ns in snapshot_ckpts(output_dir).items()
+        if before.get(name) != mtime_ns
+    ]
+    if not changed:
+        return None
+    return output_dir / max(changed)[1]
+
+
+_convert_lock = threading.Lock()
+
+
+def stage_convert(
+    converter: str,
+    src_path: str,
+    name: str,
+    output_dir: Path,
+    version: str | None,
+    scale_factor: str | None,
+    non_interactive: bool,
+) -> tuple[Path | None, str | None]:
+    """
+    Stage 6: Run LoRAConverter (re-prompting for a version if it fails
+    without one), then find and tidy the new .ckpt.
+    Returns (ckpt path or None on failure, version actually used).
+    """
+    # Snapshot the output dir so the new (or overwritten) .ckpt can be told
+    # apart afterwards
+    before = snapshot_ckpts(output_dir)
+
+    cmd = converter_cmd(converter, src_path, name, output_dir, version, scale_factor)
+    print(f"  [run] {' '.join(cmd)}")
+    returncode, stderr, out_tail, out_lines = run_converter(cmd)
+
+    if returncode != 0:
+        print(f"  [error] LoRAConverter failed (exit {returncode})")
+        if stderr:
+            print(f"  {stderr}")
+
+        # If version was not set, maybe that's why it failed — try prompting
+        if not version:
+            version = prompt_version(Path(src_path).name, non_interactive)
+            if version:
+                cmd = converter_cmd(converter, src_path, name, output_dir, version, scale_factor)
+                print(f"  [retry] {' '.join(cmd)}")
+                returncode, stderr, out_tail, out_lines = run_converter(cmd)
+                if returncode != 0:
+                    print(f"  [error] LoRAConverter still failed (exit {returncode})")
+                    if stderr:
+                        print(f"  {stderr}")
+                    return None, version
+            else:
+                print("  [skip] no version selected")
+                return None, version
+
+    # LoRAConverter dumps every weight hash to stdout — only show on error
+    if returncode != 0 and out_tail:
+        # Trim to the last few lines to avoid flooding the terminal
+        if out_lines > len(out_tail):
+            print(f"  [out] ...({out_lines - len(out_tail)} lines omitted)")
+        for line in out_tail:
+            print(f"  [out] {line}")
+
+    # Find new .ckpt file
+    ckpt_path = new_ckpt_since(output_dir, before)
+    if ckpt_path is None:
+        print("  [error] no new .ckpt file found in output directory")
+        return None, version
+
+    # Clean up .ckpt filename: collapse consecutive _, remove _lora
+    clean_name = ckpt_path.name
+    clean_name = clean_name.replace("_lora_", "_")
+    clean_name = _CKPT_UNDERSCORES_RE.sub("_", clean_name)
+    if clean_name != ckpt_path.name:
+        new_path = ckpt_path.with_name(clean_name)
+        ckpt_path.rename(new_path)
+        ckpt_path = new_path
+
+    return ckpt_path, version
+
+
 # ── main processing ──────────────────────────────────────────────────────────
 
 def process_file(
@@ -814,6 +1494,7 @@ def process_file(
     output_dir: Path,
     json_path: Path,
     entries: list,
+    index: dict,
     cli_version: str | None,
     cli_name: str | None,
     scale_factor: str | None,
@@ -825,16 +1506,21 @@ def process_file(
     skip_convert: bool,
     fix_only: bool,
     tag_only: bool,
+    prefetched_civitai: dict | None = None,
+    stat_result: os.stat_result | None = None,
+    precomputed_sha256: str | None = None,
+    converter: str = "LoRAConverter",
 ) -> bool:
     """Process a single safetensors file. Returns True on success."""
-    p = Path(src_path).resolve()
-    src_path = str(p)
+    src_path = os.path.realpath(src_path)
+    p = Path(src_path)
     print(f"\n{'─'*60}")
     print(f"  {p.name}")
     print(f"{'─'*60}")
 
     # ── Stage 1-2: SHA256 + CivitAI ─────────────────────────────────────
-    sha256 = stage_sha256_and_civitai(src_path, skip_civitai)
+    sha256 = stage_sha256_and_civitai(
+        src_path, skip_civitai, prefetched_civitai, precomputed_sha256)
 
     # ── Stage 3: Header fix ──────────────────────────────────────────────
     if not skip_fix and not tag_only:
@@ -853,30 +1539,35 @@ def process_file(
         print(f"  [done] skip-convert mode (no LoRAConverter call)")
         return True
 
+    # Snapshot xattrs once — stages 1-3 are the only writers to the source
+    xattrs = read_all_xattrs(src_path)
+
     # ── Stage 4: Pre-flight checks ───────────────────────────────────────
-    ok, reason = preflight(src_path, entries, size_limit_mb)
+    with _registry_lock:
+        ok, reason = preflight(src_path, index, size_limit_mb, xattrs, stat_result)
     if not ok:
         print(f"  [skip] {reason}")
         return False
 
     # ── Stage 5: Version resolution ──────────────────────────────────────
     header = read_safetensors_header(src_path)
-    version = resolve_version(src_path, header, cli_version, non_interactive)
+    info = inspect_header(header) if header else None
+    version = resolve_version(src_path, header, cli_version, non_interactive, xattrs, info)
 
     # Get CivitAI baseModel for name prefix logic
-    civitai_base_model = get_civitai_xattr(src_path, "baseModel")
+    civitai_base_model = get_civitai_xattr(src_path, "baseModel", xattrs)
 
     # Derive name
-    name = derive_name(src_path, cli_name, civitai_base_model)
+    name = derive_name(src_path, cli_name, civitai_base_model, xattrs)
 
     # Derive trigger words
-    prefix = derive_trigger_words(src_path, version)
+    prefix = derive_trigger_words(src_path, version, xattrs)
 
     # Detect LoHa
-    is_loha = detect_is_loha(header) if header else False
+    is_loha = info["is_loha"] if info else False
 
     # Collect CivitAI data for JSON
-    civitai_data = collect_civitai_data(src_path)
+    civitai_data = collect_civitai_data(src_path, xattrs)
 
     # Report
     print(f"  name:     {name}")
@@ -892,82 +1583,15 @@ def process_file(
 
     # ── Stage 6: Call LoRAConverter ───────────────────────────────────────
 
-    # Snapshot output dir before conversion
-    before = set(output_dir.glob("*.ckpt")) if output_dir.exists() else set()
-
-    cmd = [
-        "LoRAConverter",
-        "--file", src_path,
-        "--name", name,
-        "--output-directory", str(output_dir),
-    ]
-    # Always pass --version when known — LoRAConverter's built-in detection
-    # fails on OneTrainer/diffusers format LoRAs (common format).
-    if version:
-        cmd += ["--version", version]
-    if scale_factor:
-        cmd += ["--scale-factor", scale_factor]
-
-    print(f"  [run] {' '.join(cmd)}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
-
-    if result.returncode != 0:
-        stderr = result.stderr.strip()
-        print(f"  [error] LoRAConverter failed (exit {result.returncode})")
-        if stderr:
-            print(f"  {stderr}")
-
-        # If version was not set, maybe that's why it failed — try prompting
-        if not version:
-            version = prompt_version(p.name, non_interactive)
-            if version:
-                cmd_retry = [
-                    "LoRAConverter",
-                    "--file", src_path,
-                    "--name", name,
-                    "--output-directory", str(output_dir),
-                    "--version", version,
-                ]
-                if scale_factor:
-                    cmd_retry += ["--scale-factor", scale_factor]
-                print(f"  [retry] {' '.join(cmd_retry)}")
-                result = subprocess.run(cmd_retry, capture_output=True, text=True)
-                if result.returncode != 0:
-                    print(f"  [error] LoRAConverter still failed (exit {result.returncode})")
-                    if result.stderr.strip():
-                        print(f"  {result.stderr.strip()}")
-                    return False
-            else:
-                print("  [skip] no version selected")
-                return False
-
-    # LoRAConverter dumps every weight hash to stdout — only show on error
-    if result.returncode != 0 and result.stdout.strip():
-        # Trim to last 5 lines to avoid flooding the terminal
-        lines = result.stdout.strip().splitlines()
-        if len(lines) > 5:
-            print(f"  [out] ...({len(lines) - 5} lines omitted)")
-        for line in lines[-5:]:
-            print(f"  [out] {line}")
-
-    # Find new .ckpt file
-    after = set(output_dir.glob("*.ckpt")) if output_dir.exists() else set()
-    new_files = after - before
-    if not new_files:
-        print("  [error] no new .ckpt file found in output directory")
+    # One conversion at a time: the new .ckpt is found by diffing a shared
+    # output directory, which concurrent conversions would make ambiguous
+    with _convert_lock:
+        ckpt_path, version = stage_convert(
+            converter, src_path, name, output_dir, version, scale_factor,
+            non_interactive)
+    if ckpt_path is None:
         return False
 
-    ckpt_path = sorted(new_files, key=lambda f: f.stat().st_mtime)[-1]
-
-    # Clean up .ckpt filename: collapse consecutive _, remove _lora
-    clean_name = ckpt_path.name
-    clean_name = clean_name.replace("_lora_", "_")
-    clean_name = re.sub(r"_+", "_", clean_name)
-    if clean_name != ckpt_path.name:
-        new_path = ckpt_path.with_name(clean_name)
-        ckpt_path.rename(new_path)
-        ckpt_path = new_path
-
     ckpt_filename = ckpt_path.name
     print(f"  [ok] → {ckpt_filename}")
 
@@ -977,26 +1601,39 @@ def process_file(
 
     # ── Stage 7: Register in JSON ────────────────────────────────────────
 
-    existing = is_duplicate(entries, ckpt_filename, None)
-    if existing:
-        print(f"  [skip] JSON entry already exists for {ckpt_filename!r}")
-    else:
-        entry = {
-            "sha256": ckpt_sha256,
-            "name": name,
-            "version": version or "",
-            "file": ckpt_filename,
-            "prefix": prefix,
-            "is_lo_ha": is_loha,
-        }
-        if civitai_data:
-            entry["civitai"] = civitai_data
-        entries.append(entry)
-        print(f"  [json] registered as {name!r}")
+    with _registry_lock:
+        existing = is_duplicate(index, ckpt_filename, None)
+        same = None if existing else index["ckpt"].get(ckpt_sha256)
+        if same is not None:
+            twin = output_dir / same.get("file", "")
+            if _is_separate_copy(ckpt_path, twin):
+                # Identical output already registered under another filename —
+                # drop the copy rather than leave an unlisted model behind
+                ckpt_path.unlink(missing_ok=True)
+                print(f"  [skip] already imported as {same.get('name', '?')!r} (ckpt SHA256 match)")
+                return False
+            if not twin.is_file():
+                print(f"  [warn] {same.get('name', '?')!r} has the same ckpt SHA256 but "
+                      f"{same.get('file')!r} is missing — registering this copy")
+        if existing:
+            print(f"  [skip] JSON entry already exists for {ckpt_filename!r}")
+        else:
+            entry = {
+                "sha256": ckpt_sha256,
+                "name": name,
+                "version": version or "",
+                "file": ckpt_filename,
+                "prefix": prefix,
+                "is_lo_ha": is_loha,
+            }
+            if civitai_data:
+                entry["civitai"] = civitai_data
+            add_entry(entries, index, entry)
+            print(f"  [json] registered as {name!r}")
 
     # ── Stage 8: Propagate xattrs ────────────────────────────────────────
 
-    n = propagate_xattrs(src_path, str(ckpt_path))
+    n = propagate_xattrs(src_path, str(ckpt_path), xattrs)
     print(f"  [xattr] copied {n} attributes to {ckpt_filename}")
 
     return True
@@ -1017,15 +1654,19 @@ def load_config() -> dict[str, str]:
     Keys are CLI flag names without '--' (e.g. 'output-dir=/path').
     Lines starting with '#' are comments. Returns dict of key→value.
     """
+    # Open directly rather than exists() + read: one stat fewer per
+    # invocation, which matters for per-file Automator firings
     for base in CONFIG_DIRS:
-        cfg = base / CONFIG_SUBPATH
-        if cfg.exists():
+        try:
+            text = (base / CONFIG_SUBPATH).read_text()
             break
+        except (FileNotFoundError, NotADirectoryError):
+            continue
     else:
         return {}
 
     result = {}
-    for line in cfg.read_text().splitlines():
+    for line in text.splitlines():
         line = line.strip()
         if not line or line.startswith("#"):
             continue
@@ -1040,18 +1681,88 @@ def load_config() -> dict[str, str]:
 
 # ── CLI entry point ──────────────────────────────────────────────────────────
 
-def collect_safetensors(paths: list[str]) -> list[Path]:
-    """Expand directories and collect all .safetensors files."""
+def _scan_safetensors(root: str, found: list) -> None:
+    """Recursive os.scandir walk; DirEntry.stat() results are kept, not redone."""
+    try:
+        it = os.scandir(root)
+    except OSError as e:
+        print(f"[warn] cannot read {root}: {e}")
+        return
+    with it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                _scan_safetensors(entry.path, found)
+            elif entry.name.endswith(".safetensors") and entry.is_file():
+                found.append((Path(entry.path), entry.stat()))
+
+
+def collect_safetensors(paths: list[str]) -> list[tuple[Path, os.stat_result]]:
+    """
+    Expand directories and collect all .safetensors files, each paired with
+    its stat result so later stages don't stat the file again.
+    """
     result = []
     for p_str in paths:
-        p = Path(p_str)
-        if p.is_dir():
-            result.extend(sorted(p.rglob("*.safetensors")))
-        elif p.is_file() and p.suffix == ".safetensors":
-            result.append(p)
+        try:
+            st = os.stat(p_str)
+        except OSError:
+            st = None
+        if st is not None and stat.S_ISDIR(st.st_mode):
+            found = []
+            _scan_safetensors(p_str, found)
+            result.extend(sorted(found, key=lambda f: f[0]))
+        elif st is not None and stat.S_ISREG(st.st_mode) and p_str.endswith(".safetensors"):
+            result.append((Path(p_str), st))
         else:
             print(f"[warn] skipping {p_str} (not a .safetensors file or directory)")
-    return result
+
+    # The same file named twice (or via a link / overlapping dirs) is
+    # processed once — never concurrently on one inode
+    seen = set()
+    unique = []
+    for f, st in result:
+        real = os.path.realpath(f)
+        if real not in seen:
+            seen.add(real)
+            unique.append((f, st))
+    return unique
+
+
+class _ThreadBufferedStdout:
+    """
+    sys.stdout stand-in for the parallel per-file loop. Output from a thread
+    between begin() and end() is held back and written as one block, so
+    each file's log stays contiguous instead of interleaving.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def begin(self) -> None:
+        self._local.buf = []
+
+    def end(self) -> None:
+        buf, self._local.buf = self._local.buf, None
+        with self._lock:
+            self._stream.write("".join(buf))
+            self._stream.flush()
+
+    def write(self, s: str) -> int:
+        buf = getattr(self._local, "buf", None)
+        if buf is None:
+            with self._lock:
+                return self._stream.write(s)
+        buf.append(s)
+        return len(s)
+
+    def flush(self) -> None:
+        if getattr(self._local, "buf", None) is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
 
 
 def _cfg_get(config: dict, key: str, default=None):
@@ -1104,6 +1815,9 @@ config file:
                         help=f"Max file size in MB (default: {DEFAULT_SIZE_LIMIT_MB}, 0=unlimited)")
     parser.add_argument("--dry-run", action="store_true")
     parser.add_argument("--non-interactive", action="store_true")
+    parser.add_argument("--jobs", type=int, default=None, metavar="N",
+                        help="Parallel SHA256 workers (default: CPU count); "
+                             "with --non-interactive also files processed at once (max 4)")
 
     mode_group = parser.add_mutually_exclusive_group()
     mode_group.add_argument("--fix-only", action="store_true", help=argparse.SUPPRESS)
@@ -1138,10 +1852,19 @@ config file:
     cli_version = args.version or _cfg_get(config, "version")
     scale_factor = args.scale_factor or _cfg_get(config, "scale-factor")
 
+    if args.jobs is not None:
+        jobs = args.jobs
+    elif "jobs" in config:
+        jobs = int(config["jobs"])
+    else:
+        jobs = os.cpu_count() or 1
+    jobs = max(jobs, 1)
+
     needs_convert = not (args.fix_only or args.tag_only or args.skip_convert)
 
     # Collect files
-    files = collect_safetensors(args.inputs)
+    found = collect_safetensors(args.inputs)
+    files = [f for f, _ in found]
     if not files:
         print("No .safetensors files found.")
         sys.exit(1)
@@ -1151,9 +1874,13 @@ config file:
         sys.exit(1)
 
     # Verify output dir and LoRAConverter only if we'll be converting
+    converter = "LoRAConverter"
     if needs_convert and not args.dry_run:
         output_dir.mkdir(parents=True, exist_ok=True)
-        if not shutil.which("LoRAConverter"):
+        # Resolve once; every conversion then execs the absolute path
+        # instead of searching $PATH again
+        converter = shutil.which("LoRAConverter")
+        if not converter:
             print("[error] LoRAConverter not found on $PATH")
             sys.exit(1)
 
@@ -1161,9 +1888,9 @@ config file:
     entries = []
     if needs_convert:
         entries = load_json(json_path)
-        if not args.dry_run and json_path.exists():
-            backup_json(json_path)
-            print(f"[backup] {json_path.name} → {BACKUP_DIR}/")
+    n_loaded = len(entries)
+
+    index = index_entries(entries)
 
     mode = "full pipeline"
     if args.fix_only:
@@ -1178,35 +1905,124 @@ config file:
         print(f"  output:  {output_dir}")
         print(f"  json:    {json_path}")
 
+    # Hash the whole batch up front — SHA256 dominates wall time on big files
+    digests = {}
+    if len(files) > 1 and jobs > 1:
+        print(f"\n[sha256] hashing {len(files)} file(s) with {min(jobs, len(files))} worker(s)")
+        digests = hash_files(files, jobs)
+
+    # Batch the CivitAI lookups for files that don't have xattrs yet
+    prefetched_civitai = {}
+    if len(files) > 1 and not args.skip_civitai:
+        pending = []
+        for f in files:
+            sha = digests.get(str(f)) or get_sha256_xattr(str(f))
+            if sha and not civitai_xattr_exists(str(f)):
+                pending.append(sha)
+        if pending:
+            print(f"[civitai] looking up {len(pending)} hash(es)")
+            prefetched_civitai = prefetch_civitai(pending)
+
     # Process each file
     success = 0
     skipped = 0
 
-    for f in files:
-        ok = process_file(
-            src_path=str(f),
-            output_dir=output_dir,
-            json_path=json_path,
-            entries=entries,
-            cli_version=cli_version,
-            cli_name=args.name,
-            scale_factor=scale_factor,
-            non_interactive=non_interactive,
-            size_limit_mb=size_limit_mb,
-            dry_run=args.dry_run,
-            skip_fix=args.skip_fix,
-            skip_civitai=args.skip_civitai,
-            skip_convert=args.skip_convert,
-            fix_only=args.fix_only,
-            tag_only=args.tag_only,
-        )
-        if ok:
-            success += 1
-        else:
-            skipped += 1
+    def run(item: tuple[Path, os.stat_result]) -> tuple[bool, list]:
+        # Each file registers into its own list (the shared index is updated
+        # at once); lists are appended to entries below in input order, so
+        # custom_lora.json doesn't depend on which worker finished first
+        f, st = item
+        added = []
+        try:
+            ok = process_file(
+                src_path=str(f),
+                output_dir=output_dir,
+                json_path=json_path,
+                entries=added,
+                index=index,
+                cli_version=cli_version,
+                cli_name=args.name,
+                scale_factor=scale_factor,
+                non_interactive=non_interactive,
+                size_limit_mb=size_limit_mb,
+                dry_run=args.dry_run,
+                skip_fix=args.skip_fix,
+                skip_civitai=args.skip_civitai,
+                skip_convert=args.skip_convert,
+                fix_only=args.fix_only,
+                tag_only=args.tag_only,
+                prefetched_civitai=prefetched_civitai,
+                stat_result=st,
+                precomputed_sha256=digests.get(str(f)),
+                converter=converter,
+            )
+        except Exception as e:
+            # One bad file (corrupt header, I/O error) fails alone instead of
+            # aborting the batch and losing what the others registered
+            print(f"  [error] {f.name}: {type(e).__name__}: {e}")
+            ok = False
+        except KeyboardInterrupt:
+            # Serial run: keep anything this file already registered, then
+            # stop the loop below
+            stop.set()
+            ok = False
+        if not ok and not added:
+            with _registry_lock:
+                release_pending(index, os.path.realpath(f))
+        return ok, added
+
+    stop = threading.Event()
+
+    # Overlap one file's header fix, ckpt hashing and xattr I/O with the next
+    # file's conversion. Only without prompts, which need the terminal in order.
+    workers = min(jobs, PROCESS_WORKERS, len(found))
+    if non_interactive and workers > 1:
+        out = _ThreadBufferedStdout(sys.stdout)
+
+        def run_buffered(item: tuple[Path, os.stat_result]) -> tuple[bool, list]:
+            out.begin()
+            try:
+                return run(item)
+            finally:
+                out.end()
+
+        sys.stdout = out
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        futures = [pool.submit(run_buffered, item) for item in found]
+        try:
+            concurrent.futures.wait(futures)
+        except KeyboardInterrupt:
+            # Queued files never start; running ones finish (their
+            # LoRAConverter got the SIGINT too), and whatever they registered
+            # is still saved below
+            stop.set()
+            print("\n[interrupted] waiting for running files to finish...")
+            pool.shutdown(wait=True, cancel_futures=True)
+        finally:
+            pool.shutdown(wait=True)
+            sys.stdout = out._stream
+        results = [fut.result() for fut in futures if not fut.cancelled()]
+    else:
+        results = (run(item) for item in found if not stop.is_set())
 
-    # Save JSON if any changes were made
-    if needs_convert and not args.dry_run and success > 0:
+    try:
+        for ok, added in results:
+            entries.extend(added)
+            if ok:
+                success += 1
+            else:
+                skipped += 1
+    except KeyboardInterrupt:
+        stop.set()
+    if stop.is_set():
+        print("\n[interrupted] saving what was registered so far")
+
+    # Back up and rewrite the JSON only if entries were actually added —
+    # a run of duplicates or failures leaves the registry untouched
+    if needs_convert and not args.dry_run and len(entries) > n_loaded:
+        if json_path.exists():
+            backup_json(json_path)
+            print(f"\n[backup] {json_path.name} → {BACKUP_DIR}/")
         save_json(json_path, entries)
         print(f"\n[saved] {json_path}")
 
@@ -1214,6 +2030,8 @@ config file:
     print(f"\n{'═'*60}")
     print(f"  Done: {success} processed, {skipped} skipped/failed")
     print(f"{'═'*60}")
+    if stop.is_set():
+        sys.exit(130)
 
 
 if __name__ == "__main__":
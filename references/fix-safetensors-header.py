@@ -42,7 +42,11 @@ import json
 import os
 import argparse
 import hashlib
+import mmap
+import shutil
 import plistlib
+import http.client
+import urllib.parse
 import urllib.request
 import urllib.error
 from pathlib import Path
@@ -54,6 +58,18 @@ import ctypes.util
 
 _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
 
+# Declare prototypes once: sizes are ssize_t/size_t, not ctypes' default int
+_libc.getxattr.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_void_p,
+                           ctypes.c_size_t, ctypes.c_uint32, ctypes.c_int]
+_libc.getxattr.restype  = ctypes.c_ssize_t
+_libc.setxattr.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_void_p,
+                           ctypes.c_size_t, ctypes.c_uint32, ctypes.c_int]
+_libc.setxattr.restype  = ctypes.c_int
+_clonefile = getattr(_libc, "clonefile", None)  # macOS 10.12+
+if _clonefile is not None:
+    _clonefile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint32]
+    _clonefile.restype  = ctypes.c_int
+
 XATTR_FIX    = b"kernkraft235.safetensors.fix-v1"
 XATTR_SHA256 = b"kernkraft235.safetensors.pre-sha256sum"
 XATTR_WHERE  = b"com.apple.metadata:kMDItemWhereFroms"
@@ -132,12 +148,32 @@ def mark_where_froms(path: Path, url: str) -> None:
     plist_bytes = plistlib.dumps([url], fmt=plistlib.FMT_BINARY)
     _xattr_set(str(path), XATTR_WHERE, plist_bytes)
 
+def clone_file(src: Path, dst: Path) -> bool:
+    """APFS copy-on-write clone via clonefile(2) — O(1), xattrs included.
+    Returns False where unsupported (non-APFS volume, non-macOS libc)."""
+    if _clonefile is None:
+        return False
+    if dst.exists():
+        dst.unlink()  # clonefile refuses to overwrite
+    return _clonefile(str(src).encode(), str(dst).encode(), 0) == 0
+
 
 # ── sha256 ────────────────────────────────────────────────────────────────────
 
 def sha256_file(path: Path) -> str:
     h = hashlib.sha256()
     with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        # Hash straight from the page cache; empty files can't be mapped and
+        # 32-bit builds can't map multi-GB files, so those take the read loop
+        if size and sys.maxsize > 2**32:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                h.update(mm)
+            return h.hexdigest()
+        if hasattr(hashlib, "file_digest"):  # 3.11+: read/update loop runs in C
+            return hashlib.file_digest(f, "sha256").hexdigest()
         while True:
             chunk = f.read(16 * 1024 * 1024)
             if not chunk:
@@ -151,8 +187,43 @@ def sha256_file(path: Path) -> str:
 CIVITAI_BY_HASH = "https://civitai.com/api/v1/model-versions/by-hash/{}"
 CIVITAI_MODEL   = "https://civitai.com/models/{}"
 
+# One keep-alive connection for the whole run: a batch of dropped files pays
+# the TCP + TLS handshake once instead of per file
+_civitai_conn = None
+
 def fetch_civitai(sha256: str) -> dict | None:
-    url = CIVITAI_BY_HASH.format(sha256.upper())
+    global _civitai_conn
+    url   = CIVITAI_BY_HASH.format(sha256.upper())
+    parts = urllib.parse.urlsplit(url)
+    # http.client ignores HTTPS_PROXY and the macOS proxy settings — when a
+    # proxy applies, go through urllib, which honours both
+    if "https" in urllib.request.getproxies() and not urllib.request.proxy_bypass(parts.hostname):
+        return fetch_civitai_urlopen(url)
+    path = parts.path
+    if _civitai_conn is None:
+        _civitai_conn = http.client.HTTPSConnection(parts.hostname, timeout=15)
+    for attempt in range(2):
+        try:
+            _civitai_conn.request("GET", path, headers={"User-Agent": "fix-safetensors-header/1.0"})
+            resp = _civitai_conn.getresponse()
+            body = resp.read()
+            break
+        except (http.client.HTTPException, OSError):
+            _civitai_conn.close()  # stale idle connection — reconnect and retry once
+            if attempt:
+                return None
+    if resp.status == 404:
+        return None
+    if resp.status >= 400:
+        raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
+    if resp.status == 200:
+        try:
+            return json.loads(body)
+        except ValueError:
+            return None
+    return fetch_civitai_urlopen(url)  # redirect: let urllib follow it
+
+def fetch_civitai_urlopen(url: str) -> dict | None:
     req = urllib.request.Request(url, headers={"User-Agent": "fix-safetensors-header/1.0"})
     try:
         with urllib.request.urlopen(req, timeout=15) as resp:
@@ -174,7 +245,7 @@ FIX_KEYS     = 2
 
 def read_header(fin) -> dict:
     header_len = struct.unpack("<Q", fin.read(8))[0]
-    return json.loads(fin.read(header_len).decode("utf-8"))
+    return json.loads(fin.read(header_len))  # bytes in: no decoded str copy
 
 def detect_fixes(header: dict) -> int:
     flags = 0
@@ -184,16 +255,46 @@ def detect_fixes(header: dict) -> int:
         flags |= FIX_KEYS
     return flags
 
+def write_header_inplace(path: Path, fixed_bytes: bytes, header_len: int) -> None:
+    """Overwrite the header slot in place, space-padded to header_len bytes.
+    Padding is valid per the safetensors spec and keeps every data offset."""
+    padded = fixed_bytes + b" " * (header_len - len(fixed_bytes))
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        if os.pwrite(fd, padded, 8) != len(padded):
+            raise OSError(f"short write rewriting header of {path}")
+    finally:
+        os.close(fd)
+
+def copy_payload(fin, fout) -> None:
+    """Copy fin from its current offset to EOF onto fout. sendfile(2) keeps
+    the tensor data in the kernel where file-to-file transfers are allowed
+    (Linux); elsewhere falls back to a buffered copyfileobj."""
+    fout.flush()
+    offset    = fin.tell()
+    remaining = os.fstat(fin.fileno()).st_size - offset
+    try:
+        while remaining > 0:
+            sent = os.sendfile(fout.fileno(), fin.fileno(), offset, remaining)
+            if sent == 0:
+                break
+            offset    += sent
+            remaining -= sent
+        return
+    except (AttributeError, OSError):
+        pass
+    fin.seek(offset)
+    shutil.copyfileobj(fin, fout, 16 * 1024 * 1024)
+
 def build_fixed_header(header: dict, flags: int) -> bytes:
     if flags & FIX_METADATA:
         header.pop("__metadata__", None)
-    new_header = {}
-    for k, v in header.items():
-        if (flags & FIX_KEYS) and k.startswith(PREFIX):
-            new_header[k[len(PREFIX):]] = v
-        else:
-            new_header[k] = v
-    return json.dumps(new_header, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    # Metadata-only fixes serialise the dict as is; key fixes rebuild it in
+    # one pass, which keeps key order (nearly every key carries the prefix)
+    if flags & FIX_KEYS:
+        n = len(PREFIX)
+        header = {k[n:] if k.startswith(PREFIX) else k: v for k, v in header.items()}
+    return json.dumps(header, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
 
 
 # ── per-file orchestration ────────────────────────────────────────────────────
@@ -230,8 +331,9 @@ def process_file(src: Path, overwrite: bool) -> None:
         pass  # already fixed, fall through to CivitAI
     else:
         with src.open("rb") as fin:
-            header = read_header(fin)
-            flags  = detect_fixes(header)
+            header     = read_header(fin)
+            header_len = fin.tell() - 8
+            flags      = detect_fixes(header)
 
             if not flags:
                 mark_fix(src, 0)
@@ -239,28 +341,27 @@ def process_file(src: Path, overwrite: bool) -> None:
                 dst = src
             else:
                 fixed_bytes = build_fixed_header(header, flags)
+                dst = src if overwrite else src.with_name(src.stem + "-FIXED.safetensors")
 
-                if overwrite:
-                    tmp = src.with_suffix(".tmp.safetensors")
-                    dst = src
-                else:
-                    tmp = src.with_name(src.stem + "-FIXED.safetensors")
-                    dst = tmp
-
-                with tmp.open("wb") as fout:
-                    fout.write(struct.pack("<Q", len(fixed_bytes)))
-                    fout.write(fixed_bytes)
-                    while True:
-                        chunk = fin.read(16 * 1024 * 1024)
-                        if not chunk:
-                            break
-                        fout.write(chunk)
-
-                if overwrite:
-                    tmp.replace(dst)
-                    mark_sha256(dst, digest)  # re-apply — overwrite lost the xattr
-                else:
+                # Fast path: stripping only shrinks the header, so rewrite it in
+                # place (on an APFS clone when keeping the original) and never
+                # touch the tensor data.
+                if len(fixed_bytes) <= header_len and (overwrite or clone_file(src, dst)):
+                    write_header_inplace(dst, fixed_bytes, header_len)
                     mark_sha256(dst, digest)
+                else:
+                    tmp = src.with_suffix(".tmp.safetensors") if overwrite else dst
+
+                    with tmp.open("wb") as fout:
+                        fout.write(struct.pack("<Q", len(fixed_bytes)))
+                        fout.write(fixed_bytes)
+                        copy_payload(fin, fout)
+
+                    if overwrite:
+                        tmp.replace(dst)
+                        mark_sha256(dst, digest)  # re-apply — overwrite lost the xattr
+                    else:
+                        mark_sha256(dst, digest)
 
                 fix_desc = "+".join(
                     n for bit, n in ((FIX_METADATA, "metadata"), (FIX_KEYS, "keys"))
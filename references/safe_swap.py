@@ -4,7 +4,9 @@ import torch
 import sys
 import shutil
 import os
-from safetensors.torch import load_file
+import ctypes
+import ctypes.util
+from safetensors import safe_open
 
 # --- CONFIGURATION ---
 # Use the Big 8GB file as the donor
@@ -13,30 +15,47 @@ INPUT_DONOR_CKPT  = "qwen_3_vl_4b_instruct_f16.ckpt"
 INPUT_SAFETENSORS = "model.fp16.safetensors"
 OUTPUT_NAME       = "qwen_3_vl_4b_heretic"
 
+_libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+_clonefile = getattr(_libc, "clonefile", None)  # macOS only
+if _clonefile is not None:
+    _clonefile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint32]
+    _clonefile.restype = ctypes.c_int
+
+def clone_or_copy(src, dst):
+    # APFS copy-on-write clone is O(1) for the 8GB donor; pages are only
+    # duplicated as the UPDATEs below rewrite them. Full copy otherwise.
+    if _clonefile is not None and _clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0:
+        return True
+    shutil.copy(src, dst)
+    return False
+
+# Per-layer module path (after "model.layers.N.", minus the trailing
+# ".weight"/".bias") -> Draw Things key template for that layer index
+_SUFFIX_MAP = {
+    "self_attn.q_proj": "__text_model__[t-q_proj-{}-0]",
+    "self_attn.k_proj": "__text_model__[t-k_proj-{}-0]",
+    "self_attn.v_proj": "__text_model__[t-v_proj-{}-0]",
+    "self_attn.o_proj": "__text_model__[t-out_proj-{}-0]",
+
+    "input_layernorm":          "__text_model__[t-input_layernorm-{}-0]",
+    "post_attention_layernorm": "__text_model__[t-post_attention_layernorm-{}-0]",
+
+    "mlp.gate_proj": "__text_model__[t-mlp-{}-mlp_gate_proj-0-0]",
+    "mlp.up_proj":   "__text_model__[t-mlp-{}-mlp_up_proj-0-0]",
+    "mlp.down_proj": "__text_model__[t-mlp-{}-mlp_down_proj-0-0]",
+}
+
 def map_to_dt(sf_key):
     # 1. Embeddings & Final Norm
     if sf_key == "model.embed_tokens.weight": return "__text_model__[t-tok_embeddings-0-0]"
     if sf_key == "model.norm.weight": return "__text_model__[t-norm-0-0]"
 
-    # 2. Deep Layers
-    if "model.layers." in sf_key:
-        try:
-            parts = sf_key.split(".")
-            layer_idx = parts[2]
-            suffix = ".".join(parts[3:])
-            
-            if "self_attn.q_proj" in suffix: return f"__text_model__[t-q_proj-{layer_idx}-0]"
-            if "self_attn.k_proj" in suffix: return f"__text_model__[t-k_proj-{layer_idx}-0]"
-            if "self_attn.v_proj" in suffix: return f"__text_model__[t-v_proj-{layer_idx}-0]"
-            if "self_attn.o_proj" in suffix: return f"__text_model__[t-out_proj-{layer_idx}-0]"
-            
-            if "input_layernorm" in suffix:  return f"__text_model__[t-input_layernorm-{layer_idx}-0]"
-            if "post_attention_layernorm" in suffix: return f"__text_model__[t-post_attention_layernorm-{layer_idx}-0]"
-            
-            if "mlp.gate_proj" in suffix: return f"__text_model__[t-mlp-{layer_idx}-mlp_gate_proj-0-0]"
-            if "mlp.up_proj" in suffix:   return f"__text_model__[t-mlp-{layer_idx}-mlp_up_proj-0-0]"
-            if "mlp.down_proj" in suffix: return f"__text_model__[t-mlp-{layer_idx}-mlp_down_proj-0-0]"
-        except: pass
+    # 2. Deep Layers: model.layers.<idx>.<module>.<param>
+    if sf_key.startswith("model.layers."):
+        parts = sf_key.split(".", 3)
+        if len(parts) == 4:
+            template = _SUFFIX_MAP.get(parts[3].rpartition(".")[0])
+            if template: return template.format(parts[2])
     return None
 
 def main():
@@ -51,25 +70,32 @@ def main():
         sys.exit(1)
 
     # 2. Load Weights
-    print(f"[:] Loading {INPUT_SAFETENSORS}...", flush=True)
-    sf_tensors = load_file(INPUT_SAFETENSORS)
+    # safe_open mmaps the file and only parses the header; tensors are read
+    # on demand below, so unmapped keys (vision tower etc.) are never loaded.
+    print(f"[:] Opening {INPUT_SAFETENSORS}...", flush=True)
+    sf_file = safe_open(INPUT_SAFETENSORS, framework="pt")
     
-    sf_map = {}
-    for k, v in sf_tensors.items():
+    sf_map = {}  # dt_key -> safetensors key
+    for k in sf_file.keys():
         dt_key = map_to_dt(k)
-        if dt_key: sf_map[dt_key] = v
+        if dt_key: sf_map[dt_key] = k
             
     print(f"[:] Mapped {len(sf_map)} tensors ready for injection.", flush=True)
 
     # 3. Clone Donor
     out_ckpt = f"{OUTPUT_NAME}.ckpt"
-    print(f"[:] Cloning {INPUT_DONOR_CKPT} (This may take a minute)...", flush=True)
+    print(f"[:] Cloning {INPUT_DONOR_CKPT}...", flush=True)
     if os.path.exists(out_ckpt): os.remove(out_ckpt)
-    shutil.copy(INPUT_DONOR_CKPT, out_ckpt)
+    if not clone_or_copy(INPUT_DONOR_CKPT, out_ckpt):
+        print("[:] clonefile unavailable, made a full copy.", flush=True)
     
     # 4. Open DB
-    conn = sqlite3.connect(out_ckpt)
+    conn = sqlite3.connect(out_ckpt, isolation_level=None)
     cursor = conn.cursor()
+    # The output is a scratch clone rebuilt from inputs on failure, so skip the
+    # rollback journal (it would copy every overwritten page, GBs of it) and
+    # the per-commit fsync. Not WAL: that mode is persisted in the ckpt itself.
+    cursor.executescript("PRAGMA journal_mode=OFF; PRAGMA synchronous=OFF; PRAGMA temp_store=MEMORY;")
     
     # Verify Schema matches what you saw in 'head'
     cursor.execute("PRAGMA table_info(tensors)")
@@ -85,24 +111,36 @@ def main():
     db_keys = [r[0] for r in cursor.fetchall()]
     
     updated_count = 0
-    for key in db_keys:
-        if key in sf_map:
-            tensor = sf_map[key]
-            
-            # A. Clamp (Fixes Deep Fried / BF16 artifacts)
-            clamped = torch.clamp(tensor.float(), min=-65500.0, max=65500.0)
-            
-            # B. Cast to F16
-            data_bytes = clamped.to(torch.float16).numpy().tobytes()
-            
-            # C. Update BLOB
-            # Note: We also set type=1 (F16) just to be safe, though donor is likely already 1.
-            cursor.execute("UPDATE tensors SET data=?, type=1 WHERE name=?", (data_bytes, key))
-            
-            updated_count += 1
-            if updated_count % 50 == 0: print(f"    Injected {updated_count} layers...", end="\r", flush=True)
+    def updates():
+        # Generator so only one converted tensor is alive at a time
+        nonlocal updated_count
+        for key in db_keys:
+            if key in sf_map:
+                tensor = sf_file.get_tensor(sf_map[key])
+                
+                # A. Clamp (Fixes Deep Fried / BF16 artifacts)
+                # B. Cast to F16
+                # Cast first and clamp in place: out-of-range values become inf
+                # and clamp back to 65500, without an FP32 copy of the tensor.
+                # BF16 goes through FP32 so the clamp sees the original values.
+                if tensor.dtype == torch.bfloat16:
+                    fp16 = tensor.float().clamp_(min=-65500.0, max=65500.0).to(torch.float16)
+                else:
+                    fp16 = tensor.to(torch.float16).clamp_(min=-65500.0, max=65500.0)
+                # Bind the raw buffer: sqlite3 takes any bytes-like object, so
+                # a uint8 memoryview skips the .tobytes() copy of the tensor
+                data_bytes = memoryview(fp16.contiguous().reshape(-1).view(torch.uint8).numpy())
+                
+                # C. Update BLOB
+                # Note: We also set type=1 (F16) just to be safe, though donor is likely already 1.
+                yield (data_bytes, key)
+                
+                updated_count += 1
+                if updated_count % 50 == 0: print(f"    Injected {updated_count} layers...", end="\r", flush=True)
 
-    conn.commit()
+    cursor.execute("BEGIN")
+    cursor.executemany("UPDATE tensors SET data=?, type=1 WHERE name=?", updates())
+    cursor.execute("COMMIT")
     conn.close()
     
     print(f"\n[:] DONE. Updated {updated_count} layers.", flush=True)